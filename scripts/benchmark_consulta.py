@@ -0,0 +1,137 @@
+import argparse
+import http.client
+import logging
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+# Configuração do logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%d/%m/%Y %H:%M:%S'
+)
+
+logger = logging.getLogger(__name__)
+
+# Consultas típicas dos consumidores, repetidas em ciclo por cada cliente
+consultas_padrao = [
+    "/conjuntos/producao_soja?ibge=4314902&ano_inicio=2010&ano_fim=2020",
+    "/conjuntos/producao_trigo?uf=RS&ano_inicio=2018&ano_fim=2020&cultura=trigo",
+    "/conjuntos/geada_convencional?uf=SC",
+    "/conjuntos/geada_automatica?ibge=4205407",
+    "/conjuntos/resultados_oni?ano_inicio=2000&ano_fim=2010",
+]
+
+def executar_cliente(host: str, porta: int, consultas: list, repeticoes: int, latencias: list, erros: list):
+    """
+    Executa as consultas em uma conexão persistente e registra a latência de cada uma.
+
+    Parâmetros:
+        host (str): Endereço do serviço.
+        porta (int): Porta do serviço.
+        consultas (list): Caminhos consultados em ciclo.
+        repeticoes (int): Número de requisições feitas pelo cliente.
+        latencias (list): Lista compartilhada onde as latências (ms) são adicionadas.
+        erros (list): Lista compartilhada onde os erros são adicionados.
+    """
+    conexao = http.client.HTTPConnection(host, porta, timeout=30)
+    try:
+        for i in range(repeticoes):
+            caminho = consultas[i % len(consultas)]
+            inicio = time.perf_counter()
+            try:
+                conexao.request("GET", caminho)
+                resposta = conexao.getresponse()
+                resposta.read()
+            except (OSError, http.client.HTTPException) as e:
+                erros.append(f"{caminho}: {e}")
+                conexao.close()
+                conexao = http.client.HTTPConnection(host, porta, timeout=30)
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status != 200:
+                erros.append(f"{caminho}: HTTP {resposta.status}")
+    finally:
+        conexao.close()
+
+def percentil(valores: list, p: float) -> float:
+    """Retorna o percentil `p` (0-100) de uma lista já ordenada."""
+
+    indice = min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+def medir(url: str, clientes: int, repeticoes: int, consultas: list) -> dict:
+    """
+    Dispara `clientes` clientes simultâneos contra o serviço e resume as latências.
+
+    Parâmetros:
+        url (str): URL base do serviço (ex.: http://127.0.0.1:8000).
+        clientes (int): Número de clientes simultâneos.
+        repeticoes (int): Requisições por cliente.
+        consultas (list): Caminhos consultados.
+
+    Retorna:
+        dict: Percentis de latência em milissegundos, vazão e erros.
+    """
+    endereco = urlparse(url)
+    host, porta = endereco.hostname, endereco.port or 80
+
+    # Aquecimento: preenche o cache do serviço com as consultas usadas
+    executar_cliente(host, porta, consultas, len(consultas), [], [])
+
+    latencias, erros = [], []
+    threads = [
+        threading.Thread(target=executar_cliente, args=(host, porta, consultas, repeticoes, latencias, erros))
+        for _ in range(clientes)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    if not latencias:
+        return {"requisicoes": 0, "erros": erros}
+    return {
+        "requisicoes": len(latencias),
+        "vazao": len(latencias) / duracao,
+        "p50": statistics.median(latencias),
+        "p95": percentil(latencias, 95),
+        "p99": percentil(latencias, 99),
+        "max": latencias[-1],
+        "acima_10ms": sum(1 for l in latencias if l > 10),
+        "erros": erros,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede a latência do serviço de consulta com clientes simultâneos.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--repeticoes", type=int, default=50, help="Requisições por cliente.")
+    parser.add_argument("--limite-p99", type=float, default=10.0,
+                        help="Latência p99 máxima aceita, em milissegundos.")
+    parser.add_argument("consultas", nargs="*", default=consultas_padrao,
+                        help="Caminhos consultados (padrão: consultas típicas dos consumidores).")
+    args = parser.parse_args()
+
+    resultado = medir(args.url, args.clientes, args.repeticoes, args.consultas)
+    for erro in resultado["erros"][:10]:
+        logger.error(erro)
+    if not resultado["requisicoes"]:
+        logger.critical("Nenhuma requisição concluída.")
+        sys.exit(1)
+
+    logger.info(
+        f"{args.clientes} clientes, {resultado['requisicoes']} requisições, {resultado['vazao']:.0f} req/s | "
+        f"p50 {resultado['p50']:.1f} ms, p95 {resultado['p95']:.1f} ms, p99 {resultado['p99']:.1f} ms, "
+        f"máx {resultado['max']:.1f} ms, {resultado['acima_10ms']} acima de 10 ms, {len(resultado['erros'])} erros"
+    )
+    if resultado["erros"] or resultado["p99"] > args.limite_p99:
+        logger.error(f"Latência p99 acima de {args.limite_p99:.1f} ms ou requisições com erro.")
+        sys.exit(1)
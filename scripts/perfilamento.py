@@ -0,0 +1,286 @@
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Etapas do pipeline em execução na thread principal. A tupla é trocada a cada
+# mudança e `_seq_etapa` funciona como um seqlock: fica ímpar durante a troca e
+# muda de valor a cada etapa, permitindo ao amostrador descartar amostras
+# capturadas no meio de uma transição.
+_etapa_atual = ()
+_seq_etapa = 0
+
+# Perfilador de memória ativo, notificado na entrada e saída das etapas
+_perfil_memoria = None
+
+def _trocar_etapa(etapas: tuple):
+    """Troca a etapa corrente sinalizando a transição para o amostrador."""
+
+    global _etapa_atual, _seq_etapa
+    _seq_etapa += 1
+    _etapa_atual = etapas
+    _seq_etapa += 1
+
+@contextlib.contextmanager
+def etapa(nome: str):
+    """
+    Marca uma etapa do pipeline para agrupar as amostras do perfilador.
+
+    Fora do modo de perfilamento o custo é apenas o de trocar a tupla de etapas.
+
+    Parâmetros:
+        nome (str): Nome da etapa (ex.: "requisicao", "extracao", "excel").
+    """
+    anterior = _etapa_atual
+    memoria = _perfil_memoria
+    nome_completo = "/".join(anterior + (nome,))
+    if memoria is not None:
+        memoria.entrar(nome_completo)
+    _trocar_etapa(anterior + (nome,))
+    try:
+        yield
+    finally:
+        _trocar_etapa(anterior)
+        if memoria is not None:
+            memoria.sair(nome_completo)
+
+def _prefixo_saida(pasta: str, nome: str) -> str:
+    """Monta o prefixo dos arquivos de saída do perfil."""
+
+    os.makedirs(pasta, exist_ok=True)
+    return os.path.join(pasta, f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+class Perfilador:
+    """
+    Perfilador estatístico de CPU de baixo custo para as coletas.
+
+    Uma thread separada amostra a pilha da thread principal a cada `intervalo`
+    segundos e conta as pilhas no formato collapsed ("etapa;func;func N"), que
+    pode ser aberto no speedscope ou convertido em SVG com o flamegraph.pl.
+    O intervalo é um alvo: a thread precisa do GIL para amostrar, então a taxa
+    real, gravada no resumo por etapa, costuma ser menor em código CPU-bound.
+    """
+
+    def __init__(self, nome: str, pasta: str = "perfil", intervalo: float = 0.005):
+        self.nome = nome
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.amostras = Counter()
+        self.descartadas = 0
+        self._rotulos = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self._id_principal = threading.main_thread().ident
+
+    def _rotulo(self, codigo) -> str:
+        """Retorna o nome do frame no flame graph, formatado uma vez por função."""
+
+        rotulo = self._rotulos.get(codigo)
+        if rotulo is None:
+            rotulo = f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+            self._rotulos[codigo] = rotulo
+        return rotulo
+
+    def _amostrar(self):
+        """Coleta as pilhas da thread principal até o perfilador ser parado."""
+
+        while not self._parar.wait(self.intervalo):
+            seq = _seq_etapa
+            etapas = _etapa_atual
+            frame = sys._current_frames().get(self._id_principal)
+            if frame is None:
+                continue
+            if seq % 2 or seq != _seq_etapa:
+                # A etapa mudou enquanto a pilha era capturada
+                self.descartadas += 1
+                continue
+
+            pilha = []
+            while frame is not None:
+                pilha.append(self._rotulo(frame.f_code))
+                frame = frame.f_back
+            pilha.reverse()
+
+            self.amostras[("/".join(etapas) or "geral", *pilha)] += 1
+
+    def iniciar(self):
+        """Inicia a thread de amostragem."""
+
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+        self._thread.start()
+        logger.info(f"Perfilamento de CPU iniciado (intervalo alvo de {self.intervalo * 1000:.1f} ms).")
+
+    def parar(self):
+        """Para a amostragem e grava os arquivos de saída."""
+
+        self._parar.set()
+        self._thread.join()
+        duracao = time.perf_counter() - self._inicio
+        prefixo = _prefixo_saida(self.pasta, self.nome)
+
+        # Pilhas no formato collapsed para gerar o flame graph
+        with open(f"{prefixo}.collapsed", "w", encoding="utf-8") as f:
+            for pilha, contagem in self.amostras.most_common():
+                f.write(f"{';'.join(pilha)} {contagem}\n")
+
+        # Resumo das amostras por etapa do pipeline
+        total = sum(self.amostras.values())
+        por_etapa = Counter()
+        for pilha, contagem in self.amostras.items():
+            por_etapa[pilha[0]] += contagem
+        with open(f"{prefixo}_etapas.txt", "w", encoding="utf-8") as f:
+            f.write(f"Duração total: {duracao:.2f} s\n")
+            f.write(f"Amostras: {total} ({total / duracao:.0f}/s, alvo {1 / self.intervalo:.0f}/s), "
+                    f"{self.descartadas} descartadas em trocas de etapa\n")
+            for nome_etapa, contagem in por_etapa.most_common():
+                f.write(f"{nome_etapa}: {contagem} amostras ({contagem / total:.1%}), ~{duracao * contagem / total:.2f} s\n")
+
+        logger.info(f"Perfil de CPU salvo em {prefixo}.collapsed e {prefixo}_etapas.txt")
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+        return False
+
+class PerfiladorMemoria:
+    """
+    Perfilador de alocações por etapa, baseado no tracemalloc.
+
+    Por ter custo alto, roda em uma execução separada do perfilamento de CPU.
+    Cada etapa é medida a partir da memória já alocada na sua entrada: o pico
+    próprio é o pico durante a etapa menos essa base, e a memória retida é o
+    que continua alocado na saída. Para apontar as linhas responsáveis, as
+    primeiras `execucoes_comparadas` execuções de cada etapa tiram um snapshot
+    na entrada e outro na saída; é mantida a comparação da execução que mais
+    reteve memória. O limite evita snapshots completos em etapas repetidas
+    centenas de vezes, e o top-N só é calculado com o tracemalloc desligado.
+    """
+
+    def __init__(self, nome: str, pasta: str = "perfil", top_n: int = 25, profundidade: int = 1,
+                 execucoes_comparadas: int = 3):
+        self.nome = nome
+        self.pasta = pasta
+        self.top_n = top_n
+        self.profundidade = profundidade
+        self.execucoes_comparadas = execucoes_comparadas
+        # nome da etapa -> {"execucoes", "pico", "retida", "comparacao"}
+        self.etapas = {}
+        self._abertas = []
+        # Alocações do próprio perfilador não entram no top-N
+        self._ignorados = {__file__, tracemalloc.__file__, contextlib.__file__}
+
+    def entrar(self, nome_etapa: str):
+        """Guarda a base de memória da etapa e, se for comparada, o snapshot de entrada."""
+
+        atual, pico = tracemalloc.get_traced_memory()
+        if self._abertas:
+            self._abertas[-1]["pico"] = max(self._abertas[-1]["pico"], pico)
+
+        execucoes = self.etapas.get(nome_etapa, {}).get("execucoes", 0)
+        snapshot = tracemalloc.take_snapshot() if execucoes < self.execucoes_comparadas else None
+        # A base é lida depois do snapshot para não contar a memória dele
+        atual = tracemalloc.get_traced_memory()[0]
+        self._abertas.append({"base": atual, "pico": atual, "snapshot": snapshot})
+        tracemalloc.reset_peak()
+
+    def sair(self, nome_etapa: str):
+        """Registra o pico próprio e a memória retida da etapa."""
+
+        atual, pico = tracemalloc.get_traced_memory()
+        aberta = self._abertas.pop()
+        pico = max(aberta["pico"], pico)
+        if self._abertas:
+            self._abertas[-1]["pico"] = max(self._abertas[-1]["pico"], pico)
+
+        dados = self.etapas.setdefault(nome_etapa, {"execucoes": 0, "pico": 0, "retida": None, "comparacao": None})
+        dados["execucoes"] += 1
+        dados["pico"] = max(dados["pico"], pico - aberta["base"])
+        retida = atual - aberta["base"]
+
+        if aberta["snapshot"] is not None and (dados["retida"] is None or retida > dados["retida"]):
+            dados["comparacao"] = (tracemalloc.take_snapshot(), aberta["snapshot"])
+        if dados["retida"] is None or retida > dados["retida"]:
+            dados["retida"] = retida
+        tracemalloc.reset_peak()
+
+    def iniciar(self):
+        """Inicia o tracemalloc e passa a acompanhar as etapas."""
+
+        global _perfil_memoria
+        tracemalloc.start(self.profundidade)
+        _perfil_memoria = self
+        logger.info("Perfilamento de memória iniciado (tracemalloc deixa a execução mais lenta).")
+
+    def parar(self):
+        """Encerra o tracemalloc e grava o resumo de memória por etapa."""
+
+        global _perfil_memoria
+        _perfil_memoria = None
+        _, pico_total = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        prefixo = _prefixo_saida(self.pasta, self.nome)
+        mib = 1024 * 1024
+        ordenadas = sorted(self.etapas.items(), key=lambda item: -item[1]["pico"])
+
+        with open(f"{prefixo}_memoria.txt", "w", encoding="utf-8") as f:
+            f.write(f"Pico desde a última etapa: {pico_total / mib:.1f} MiB\n\n")
+            f.write("Memória própria por etapa (pico e retida acima da memória na entrada):\n")
+            for nome_etapa, dados in ordenadas:
+                f.write(f"{nome_etapa}: pico {dados['pico'] / mib:.1f} MiB, retida {dados['retida'] / mib:.1f} MiB, "
+                        f"{dados['execucoes']} execuções\n")
+
+            for nome_etapa, dados in ordenadas:
+                if dados["comparacao"] is None:
+                    continue
+                f.write(f"\nTop {self.top_n} alocações feitas na etapa {nome_etapa} "
+                        f"(entre as {min(dados['execucoes'], self.execucoes_comparadas)} primeiras execuções):\n")
+                snapshot_saida, snapshot_entrada = dados["comparacao"]
+                # filter_traces avalia fnmatch trace a trace; filtrar a comparação
+                # já agrupada por linha dá o mesmo resultado muito mais rápido
+                diferencas = [
+                    d for d in snapshot_saida.compare_to(snapshot_entrada, "lineno")
+                    if d.size_diff > 0 and d.traceback[0].filename not in self._ignorados
+                ]
+                diferencas.sort(key=lambda d: -d.size_diff)
+                for diferenca in diferencas[:self.top_n]:
+                    f.write(f"{diferenca}\n")
+
+        logger.info(f"Perfil de memória salvo em {prefixo}_memoria.txt")
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+        return False
+
+@contextlib.contextmanager
+def perfilar(cpu: bool, memoria: bool, nome: str):
+    """
+    Executa o bloco com os perfiladores pedidos na linha de comando.
+
+    Parâmetros:
+        cpu (bool): Valor da opção --profile.
+        memoria (bool): Valor da opção --profile-memoria.
+        nome (str): Nome da coleta, usado nos arquivos de saída.
+    """
+    with contextlib.ExitStack() as contexto:
+        if memoria:
+            if cpu:
+                logger.warning("Com --profile-memoria os tempos de CPU incluem o custo do tracemalloc.")
+            contexto.enter_context(PerfiladorMemoria(nome))
+        if cpu:
+            contexto.enter_context(Perfilador(nome))
+        yield
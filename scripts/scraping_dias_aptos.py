@@ -1,8 +1,12 @@
 import httpx
 import pandas as pd
 import asyncio
+import argparse
+import json
 import logging
+import os
 import unidecode
+from perfilamento import etapa, perfilar
 from datetime import datetime, timedelta
 
 # Configuração do logging
@@ -94,6 +98,17 @@ ids_nao_mapeados = {
     "São Luiz do Paraitinga": 3550001
 }
 
+# Rótulo gravado na coluna Probabilidade para cada código da API
+probabilidades_rotulos = {
+    '1': 'Anual'
+}
+
+praticas_agricolas = {
+    '1': 'Preparo do Solo',
+    '2': 'Semeadura',
+    '3': 'Colheita'
+}
+
 def extrair_dados_municipios():
     """Realiza a requisição à API do IBGE para buscar dados sobre os municípios."""
 
@@ -135,14 +150,25 @@ async def fetch_estacoes():
         logger.error(f"Erro ao buscar estações: {e}")
         raise
 
-async def fetch_dias_aptos(client: httpx.AsyncClient, estacao_id, pratica_agricola, data_plantio):
+def buscar_id_estacao(cidades, nome_estacao):
+    """Busca o ID do município da estação, usando as associações manuais quando necessário."""
+
+    id_cidade = buscar_id_por_nome(cidades, nome_estacao.split("(")[0].strip())
+    if not id_cidade:
+        municipio = locais_associacoes.get(nome_estacao, "local não encontrado")
+        id_cidade = buscar_id_por_nome(cidades, municipio)
+        if not id_cidade:
+            id_cidade = ids_nao_mapeados.get(municipio, None)
+    return id_cidade
+
+async def fetch_dias_aptos(client: httpx.AsyncClient, estacao_id, pratica_agricola, data_plantio, probabilidade='1'):
     """Faz a requisição à API para buscar os dias aptos para manejo solo"""
 
     url_manejo = "https://sisdagro.inmet.gov.br/sisdagro/app/climatologia/diasaptosmanejosolo/dams.json"
     
     payload = {
         'dataPlantio': data_plantio,
-        'probabilidade': '1',
+        'probabilidade': probabilidade,
         'praticaAgricola': pratica_agricola,
         'dataInicial': 'Selecione',
         'culturaId': '',
@@ -188,40 +214,35 @@ async def main():
         for estacao in estacoes:
             estacao_id = estacao["codigoStr"]
             nome_estacao = estacao["nome"]
-            id_cidade = buscar_id_por_nome(cidades, nome_estacao.split("(")[0].strip())
-            if not id_cidade:
-                municipio = locais_associacoes.get(nome_estacao, "local não encontrado")
-                id_cidade = buscar_id_por_nome(cidades, municipio)
-                if not id_cidade:
-                    id_cidade = ids_nao_mapeados.get(municipio, None)
+            with etapa("municipio"):
+                id_cidade = buscar_id_estacao(cidades, nome_estacao)
 
             logger.info(f"Processando estação: {nome_estacao} (ID: {id_cidade})")
             
             # Itera sobre as 3 práticas agrícolas
             for pratica_agricola in ['1', '2', '3']:
                 try:
-                    bhc_data_list = await fetch_dias_aptos(client, estacao_id, pratica_agricola, data_plantio)
+                    with etapa("requisicao"):
+                        bhc_data_list = await fetch_dias_aptos(client, estacao_id, pratica_agricola, data_plantio)
                     rows_to_add = []
 
-                    for bhc_data in bhc_data_list:
-                        row = {
-                            'Cod. IBGE': id_cidade,
-                            'Probabilidade': 'Anual',
-                            'Pratica Agricola': (
-                                'Preparo do Solo' if pratica_agricola == '1' else
-                                'Semeadura' if pratica_agricola == '2' else
-                                'Colheita'
-                            ),
-                            'Estação': nome_estacao,
-                            'Decêndio': bhc_data['decendio'],
-                            'Mês': bhc_data['mes'],
-                            'Dias Aptos': bhc_data['posicaoDia'],
-                            'Porcentagem Dias Aptos': f"{bhc_data['valorDia']:.2f}%"
-                        }
-                        rows_to_add.append(row)
+                    with etapa("tratamento"):
+                        for bhc_data in bhc_data_list:
+                            row = {
+                                'Cod. IBGE': id_cidade,
+                                'Probabilidade': probabilidades_rotulos['1'],
+                                'Pratica Agricola': praticas_agricolas[pratica_agricola],
+                                'Estação': nome_estacao,
+                                'Decêndio': bhc_data['decendio'],
+                                'Mês': bhc_data['mes'],
+                                'Dias Aptos': bhc_data['posicaoDia'],
+                                'Porcentagem Dias Aptos': f"{bhc_data['valorDia']:.2f}%"
+                            }
+                            rows_to_add.append(row)
 
                     # Insira os valores da estação no Dataframe
-                    df = pd.concat([df, pd.DataFrame(rows_to_add)], ignore_index=True)
+                    with etapa("concatenacao"):
+                        df = pd.concat([df, pd.DataFrame(rows_to_add)], ignore_index=True)
                     
                 except Exception as e:
                     logger.warning(f"Erro ao processar dados para a estação {nome_estacao}, prática agrícola {pratica_agricola}. Erro: {e}")
@@ -230,15 +251,236 @@ async def main():
     
     try:
         # Salvando os dados em um arquivo Excel
-        df.to_excel('dias_aptos_manejo_solo.xlsx', index=False)
+        with etapa("excel"):
+            df.to_excel('dias_aptos_manejo_solo.xlsx', index=False)
         logger.info("Arquivo Excel gerado com sucesso!")
     except Exception as e:
         logger.error(f"Erro ao salvar o arquivo Excel: {e}")
 
+def montar_cenarios(datas_plantio, probabilidades, praticas):
+    """
+    Monta a grade de cenários (data de plantio x probabilidade x prática agrícola).
+
+    Parâmetros:
+        datas_plantio (list): Datas de plantio no formato DD/MM/YYYY.
+        probabilidades (list): Códigos de probabilidade aceitos pela API.
+        praticas (list): Códigos das práticas agrícolas ('1', '2' ou '3').
+
+    Retorna:
+        list: Cenários únicos, na ordem em que aparecem na grade.
+    """
+    cenarios = {}
+    for data_plantio in datas_plantio:
+        data_normalizada = datetime.strptime(data_plantio.strip(), '%d/%m/%Y').strftime('%d/%m/%Y')
+        for probabilidade in probabilidades:
+            for pratica_agricola in praticas:
+                cenario = (data_normalizada, str(probabilidade).strip(), str(pratica_agricola).strip())
+                cenarios.setdefault(cenario, None)
+    return list(cenarios)
+
+def ler_checkpoint(caminho_checkpoint):
+    """
+    Lê as respostas já obtidas em execuções anteriores do backfill.
+
+    Parâmetros:
+        caminho_checkpoint (str): Arquivo JSON Lines do checkpoint.
+
+    Retorna:
+        dict: Respostas da API indexadas por (estacaoId, dataPlantio, probabilidade, praticaAgricola).
+    """
+    respostas = {}
+    if not os.path.exists(caminho_checkpoint):
+        return respostas
+
+    invalidas = 0
+    with open(caminho_checkpoint, encoding='utf-8') as f:
+        conteudo = f.read()
+    for linha in conteudo.splitlines():
+        try:
+            registro = json.loads(linha)
+            respostas[tuple(registro["chave"])] = registro["bhc"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            # Linha incompleta de uma execução interrompida
+            invalidas += 1
+
+    if invalidas or (conteudo and not conteudo.endswith("\n")):
+        # Regrava só os registros válidos, terminando em quebra de linha, para
+        # que o próximo registro não seja anexado a uma linha truncada
+        logger.warning(f"Removendo {invalidas} linhas inválidas do checkpoint.")
+        with open(caminho_checkpoint, 'w', encoding='utf-8') as f:
+            for chave, bhc_data_list in respostas.items():
+                f.write(json.dumps({"chave": list(chave), "bhc": bhc_data_list}, ensure_ascii=False) + "\n")
+
+    logger.info(f"{len(respostas)} requisições recuperadas do checkpoint {caminho_checkpoint}.")
+    return respostas
+
+async def backfill(datas_plantio, probabilidades, praticas=('1', '2', '3'), concorrencia=8,
+                   caminho_checkpoint='dias_aptos_backfill.jsonl', arquivo_saida='dias_aptos_cenarios.xlsx'):
+    """
+    Busca os dias aptos para todas as estações em uma grade de cenários.
+
+    As requisições repetidas são descartadas, executadas com no máximo `concorrencia`
+    chamadas simultâneas e gravadas no checkpoint assim que respondidas, de modo que
+    uma nova execução retoma apenas o que faltou.
+
+    Parâmetros:
+        datas_plantio (list): Datas de plantio no formato DD/MM/YYYY.
+        probabilidades (list): Códigos de probabilidade aceitos pela API.
+        praticas (list): Códigos das práticas agrícolas.
+        concorrencia (int): Número máximo de requisições simultâneas.
+        caminho_checkpoint (str): Arquivo JSON Lines com as respostas já obtidas.
+        arquivo_saida (str): Arquivo Excel com a tabela consolidada.
+    """
+    cenarios = montar_cenarios(datas_plantio, probabilidades, praticas)
+    if not cenarios:
+        logger.error("Nenhum cenário informado para o backfill. Abortando execução.")
+        return
+    if concorrencia < 1:
+        logger.error("A concorrência do backfill deve ser de pelo menos 1 requisição.")
+        return
+    logger.info(f"Backfill com {len(cenarios)} cenários.")
+
+    cidades = extrair_dados_municipios()
+
+    try:
+        estacoes = await fetch_estacoes()
+    except Exception as e:
+        logger.critical("Falha ao buscar estações. Abortando execução.")
+        return
+
+    # Estações repetidas na lista geram a mesma requisição
+    estacoes_unicas = {estacao["codigoStr"]: estacao for estacao in estacoes}
+    respostas = ler_checkpoint(caminho_checkpoint)
+    pendentes = [
+        (estacao_id, *cenario)
+        for estacao_id in estacoes_unicas
+        for cenario in cenarios
+        if (estacao_id, *cenario) not in respostas
+    ]
+    logger.info(f"{len(pendentes)} requisições pendentes.")
+
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    with open(caminho_checkpoint, 'a', encoding='utf-8') as checkpoint:
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concorrencia)) as client:
+
+            async def executar(chave):
+                estacao_id, data_plantio, probabilidade, pratica_agricola = chave
+                async with semaforo:
+                    try:
+                        bhc_data_list = await fetch_dias_aptos(client, estacao_id, pratica_agricola, data_plantio, probabilidade)
+                    except Exception as e:
+                        logger.warning(f"Erro no cenário {chave}. Será refeito na próxima execução. Erro: {e}")
+                        return
+                respostas[chave] = bhc_data_list
+                checkpoint.write(json.dumps({"chave": list(chave), "bhc": bhc_data_list}, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+
+            await asyncio.gather(*(executar(chave) for chave in pendentes))
+
+    # As requisições concorrentes se intercalam, então só a consolidação é marcada como etapa
+    with etapa("consolidacao"):
+        df = consolidar_respostas(respostas, estacoes_unicas, cenarios, cidades)
+
+    try:
+        with etapa("excel"):
+            df.to_excel(arquivo_saida, index=False)
+        logger.info(f"Tabela consolidada com {len(df)} linhas salva em {arquivo_saida}.")
+    except Exception as e:
+        logger.error(f"Erro ao salvar o arquivo Excel: {e}")
+
+def consolidar_respostas(respostas, estacoes_unicas, cenarios, cidades):
+    """
+    Monta a tabela tipada do backfill, com uma linha por cenário, estação e decêndio.
+
+    Parâmetros:
+        respostas (dict): Respostas da API indexadas por (estacaoId, dataPlantio, probabilidade, praticaAgricola).
+        estacoes_unicas (dict): Estações indexadas pelo código.
+        cenarios (list): Cenários da grade atual.
+        cidades (list): Municípios retornados pela API do IBGE.
+
+    Retorna:
+        pd.DataFrame: Tabela consolidada.
+    """
+    rows = []
+    ids_cidades = {}
+    cenarios_grade = set(cenarios)
+    for (estacao_id, data_plantio, probabilidade, pratica_agricola), bhc_data_list in respostas.items():
+        estacao = estacoes_unicas.get(estacao_id)
+        if estacao is None or (data_plantio, probabilidade, pratica_agricola) not in cenarios_grade:
+            continue
+        nome_estacao = estacao["nome"]
+        if nome_estacao not in ids_cidades:
+            ids_cidades[nome_estacao] = buscar_id_estacao(cidades, nome_estacao)
+
+        for bhc_data in bhc_data_list:
+            rows.append({
+                'Data Plantio': data_plantio,
+                'Probabilidade': probabilidades_rotulos.get(probabilidade, probabilidade),
+                'Pratica Agricola': praticas_agricolas.get(pratica_agricola, pratica_agricola),
+                'Cod. IBGE': ids_cidades[nome_estacao],
+                'Estação': nome_estacao,
+                'Decêndio': bhc_data['decendio'],
+                'Mês': bhc_data['mes'],
+                'Dias Aptos': bhc_data['posicaoDia'],
+                'Porcentagem Dias Aptos': bhc_data['valorDia']
+            })
+
+    df = pd.DataFrame(rows, columns=[
+        'Data Plantio', 'Probabilidade', 'Pratica Agricola', 'Cod. IBGE', 'Estação',
+        'Decêndio', 'Mês', 'Dias Aptos', 'Porcentagem Dias Aptos'
+    ])
+    df['Data Plantio'] = pd.to_datetime(df['Data Plantio'], format='%d/%m/%Y')
+    df['Probabilidade'] = df['Probabilidade'].astype('category')
+    df['Pratica Agricola'] = df['Pratica Agricola'].astype('category')
+    df['Cod. IBGE'] = pd.to_numeric(df['Cod. IBGE'], errors='coerce').astype('Int64')
+    df['Dias Aptos'] = pd.to_numeric(df['Dias Aptos'], errors='coerce').astype('Int64')
+    df['Porcentagem Dias Aptos'] = pd.to_numeric(df['Porcentagem Dias Aptos'], errors='coerce').astype(float)
+    return df.sort_values(['Data Plantio', 'Probabilidade', 'Pratica Agricola', 'Estação']).reset_index(drop=True)
+
+def data_plantio(valor):
+    """Valida e normaliza datas de plantio informadas na linha de comando (DD/MM/YYYY)."""
+
+    try:
+        return datetime.strptime(valor.strip(), '%d/%m/%Y').strftime('%d/%m/%Y')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida, use o formato DD/MM/YYYY: {valor}")
+
+def inteiro_positivo(valor):
+    """Valida argumentos de linha de comando que precisam ser inteiros maiores que zero."""
+
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"deve ser maior ou igual a 1: {valor}")
+    return numero
+
 # Executando o código
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coleta dos dias aptos para manejo do solo.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Executa a grade de cenários em vez da coleta padrão.")
+    parser.add_argument("--datas", nargs="+", type=data_plantio, default=[],
+                        help="Datas de plantio no formato DD/MM/YYYY.")
+    parser.add_argument("--probabilidades", nargs="+", default=['1'])
+    parser.add_argument("--praticas", nargs="+", default=['1', '2', '3'])
+    parser.add_argument("--concorrencia", type=inteiro_positivo, default=8)
+    parser.add_argument("--checkpoint", default="dias_aptos_backfill.jsonl")
+    parser.add_argument("--saida", default="dias_aptos_cenarios.xlsx")
+    parser.add_argument("--profile", action="store_true",
+                        help="Salva o perfil de CPU da execução na pasta 'perfil'.")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Salva o pico e as maiores alocações de memória por etapa (execução mais lenta).")
+    args = parser.parse_args()
+    if args.backfill and not args.datas:
+        parser.error("--datas é obrigatório com --backfill")
+
     try:
         logger.info("Iniciando o programa de scraping.")
-        asyncio.run(main())
+        with perfilar(args.profile, args.profile_memoria, "scraping_dias_aptos"):
+            if args.backfill:
+                asyncio.run(backfill(args.datas, args.probabilidades, args.praticas, args.concorrencia,
+                                     args.checkpoint, args.saida))
+            else:
+                asyncio.run(main())
     except Exception as e:
         logger.critical(f"Erro fatal no programa: {e}")
@@ -1,7 +1,9 @@
 import httpx
 from bs4 import BeautifulSoup
 import pandas as pd
+import argparse
 import logging
+from perfilamento import etapa, perfilar
 
 # Configuração do logging
 logging.basicConfig(
@@ -170,17 +172,22 @@ def main(excel_file="resultados_oni.xlsx"):
         logger.info("Iniciando o processo de extração e análise")
         
         # Etapa 1: Requisição e extração dos dados
-        html = get_html(url)
-        table_data = extract_table_data(html)
+        with etapa("requisicao"):
+            html = get_html(url)
+        with etapa("extracao"):
+            table_data = extract_table_data(html)
 
         # Etapa 2: Criar DataFrame
-        df = create_dataframe(table_data)
+        with etapa("dataframe"):
+            df = create_dataframe(table_data)
 
         # Etapa 3: Analisar e classificar os fenômenos
-        df_resultados = analisar_ano(df)
+        with etapa("analise"):
+            df_resultados = analisar_ano(df)
 
         # Etapa 4: Salvar em Excel
-        save_to_excel(df_resultados, excel_file)
+        with etapa("excel"):
+            save_to_excel(df_resultados, excel_file)
         logger.info("Processo concluído com sucesso")
 
     except Exception as e:
@@ -188,5 +195,13 @@ def main(excel_file="resultados_oni.xlsx"):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extração e análise dos dados do ONI.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Salva o perfil de CPU da execução na pasta 'perfil'.")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Salva o pico e as maiores alocações de memória por etapa (execução mais lenta).")
+    args = parser.parse_args()
+
     excel_file = "resultados_oni.xlsx"
-    main(excel_file)
+    with perfilar(args.profile, args.profile_memoria, "scraping_el_nino"):
+        main(excel_file)
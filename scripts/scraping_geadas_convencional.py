@@ -1,11 +1,13 @@
 import httpx
 import pandas as pd
+import argparse
 import logging
 import calendar
 import unidecode
 import locale
 from datetime import datetime, timedelta
 import os
+from perfilamento import etapa, perfilar
 
 # Definir a localização para português
 locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
@@ -142,21 +144,23 @@ def extrair_dados_geada(folder_path: str = r"C:\Users\ana.brum\Área de Trabalho
         ultimo_dia = (data_inicio + timedelta(days=calendar.monthrange(ano, mes)[1] - 1)).strftime("%Y-%m-%d")
 
         url = f"https://apitempo.inmet.gov.br/geada/{primeiro_dia}/{ultimo_dia}/CONVENCIONAL"
-        dados = fazer_requisicao(url)
+        with etapa("requisicao"):
+            dados = fazer_requisicao(url)
 
         # Tratamento dos dados
         if dados:
-            for item in dados:
-                uf = item.get("UF", "N/A")
-                nome_cidade = item.get("NOME", "N/A").title()
-                data_ocorrencia = formatar_data_brasileira(item.get("DT_MEDICAO"))
-                temp_min = item.get("TEMP_MIN")
-                temperatura_formatada = formatar_temperatura(temp_min)
-                intensidade = calcular_intensidade(temp_min)
-                id_cidade = buscar_id_por_nome(cidades, nome_cidade)
-
-                # Adicionando os dados tratados à lista
-                dados_tratados.append([id_cidade, uf, nome_cidade, data_ocorrencia, temperatura_formatada, intensidade])
+            with etapa("tratamento"):
+                for item in dados:
+                    uf = item.get("UF", "N/A")
+                    nome_cidade = item.get("NOME", "N/A").title()
+                    data_ocorrencia = formatar_data_brasileira(item.get("DT_MEDICAO"))
+                    temp_min = item.get("TEMP_MIN")
+                    temperatura_formatada = formatar_temperatura(temp_min)
+                    intensidade = calcular_intensidade(temp_min)
+                    id_cidade = buscar_id_por_nome(cidades, nome_cidade)
+
+                    # Adicionando os dados tratados à lista
+                    dados_tratados.append([id_cidade, uf, nome_cidade, data_ocorrencia, temperatura_formatada, intensidade])
 
         # Avançar para o próximo mês
         data_inicio += timedelta(days=calendar.monthrange(ano, mes)[1])
@@ -170,8 +174,17 @@ def extrair_dados_geada(folder_path: str = r"C:\Users\ana.brum\Área de Trabalho
 
     # Caminho completo do arquivo Excel
     excel_file = os.path.join(folder_path, "dados_geada.xlsx")
-    df.to_excel(excel_file, index=False)
+    with etapa("excel"):
+        df.to_excel(excel_file, index=False)
     logger.info(f"Dados extraídos e salvos com sucesso no arquivo '{excel_file}'.")
 
 if __name__ == "__main__":
-    extrair_dados_geada()
+    parser = argparse.ArgumentParser(description="Extração dos dados de geadas das estações convencionais.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Salva o perfil de CPU da execução na pasta 'perfil'.")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Salva o pico e as maiores alocações de memória por etapa (execução mais lenta).")
+    args = parser.parse_args()
+
+    with perfilar(args.profile, args.profile_memoria, "scraping_geadas_convencional"):
+        extrair_dados_geada()
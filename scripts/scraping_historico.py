@@ -2,7 +2,9 @@ import httpx
 from bs4 import BeautifulSoup
 import os
 import zipfile
+import argparse
 import logging
+from perfilamento import etapa, perfilar
 
 # Configurando o logger
 logging.basicConfig(
@@ -56,7 +58,7 @@ def baixar_e_extrair_arquivos(pasta_destino):
 
             # Baixando o arquivo .zip
             logging.info(f"Baixando o arquivo: {nome_arquivo} de {url_zip}")
-            with httpx.stream("GET", url_zip) as r:
+            with etapa("download"), httpx.stream("GET", url_zip) as r:
                 r.raise_for_status()
                 with open(caminho_zip, 'wb') as f:
                     for chunk in r.iter_bytes():
@@ -66,7 +68,7 @@ def baixar_e_extrair_arquivos(pasta_destino):
 
             # Extraindo o arquivo .zip
             logging.info(f"Extraindo o arquivo: {nome_arquivo}")
-            with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+            with etapa("extracao"), zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
 
                 # Verifica se tem alguma pasta
                 lista = zip_ref.namelist()
@@ -88,6 +90,13 @@ def baixar_e_extrair_arquivos(pasta_destino):
         logging.error(f"Ocorreu um erro: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download dos dados históricos do INMET.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Salva o perfil de CPU da execução na pasta 'perfil'.")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Salva o pico e as maiores alocações de memória por etapa (execução mais lenta).")
+    args = parser.parse_args()
 
     pasta_destino = "Dados Historicos"
-    baixar_e_extrair_arquivos(pasta_destino)
+    with perfilar(args.profile, args.profile_memoria, "scraping_historico"):
+        baixar_e_extrair_arquivos(pasta_destino)
@@ -0,0 +1,399 @@
+import pandas as pd
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Configuração do logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%d/%m/%Y %H:%M:%S'
+)
+
+logger = logging.getLogger(__name__)
+
+# Pasta raiz do repositório, onde ficam dados_safra e dados_meteorologicos
+pasta_raiz = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Pasta onde as coletas gravam suas saídas (os scripts salvam na pasta em que são executados)
+pasta_coletas = os.getcwd()
+
+# Conjuntos de dados servidos e as colunas usadas em cada filtro
+conjuntos_dados = {
+    "producao_soja": {
+        "arquivo": os.path.join("dados_safra", "producao_soja.xlsx"),
+        "ibge": "CdIbge", "uf": "Localidade", "ano": "Ano", "cultura": "Cultura",
+    },
+    "producao_trigo": {
+        "arquivo": os.path.join("dados_safra", "producao_trigo.xlsx"),
+        "ibge": "CdIbge", "uf": "Localidade", "ano": "Ano", "cultura": "Cultura",
+    },
+    "geada_convencional": {
+        "arquivo": os.path.join("dados_meteorologicos", "dados_geada_convencional.xlsx"),
+        "ibge": "Cod. IBGE", "uf": "Uf", "ano": "Dia de ocorrência", "ano_data": True, "cultura": None,
+    },
+    "geada_automatica": {
+        "arquivo": os.path.join("dados_meteorologicos", "dados_geada_automatica.xlsx"),
+        "ibge": "Cod. IBGE", "uf": "Uf", "ano": "Dia de ocorrência", "ano_data": True, "cultura": None,
+    },
+    "resultados_oni": {
+        "arquivo": os.path.join("dados_meteorologicos", "resultados_oni.xlsx"),
+        "ibge": None, "uf": None, "ano": "Ano", "cultura": None,
+    },
+    "dias_aptos": {
+        "arquivo": "dias_aptos_manejo_solo.xlsx", "coleta": True,
+        "ibge": "Cod. IBGE", "uf": None, "ano": None, "cultura": None,
+    },
+    "dias_aptos_cenarios": {
+        "arquivo": "dias_aptos_cenarios.xlsx", "coleta": True,
+        "ibge": "Cod. IBGE", "uf": None, "ano": "Data Plantio", "ano_data": True, "cultura": None,
+    },
+}
+
+# Limites do cache de respostas, em bytes
+limite_cache_bytes = 256 * 1024 * 1024
+limite_resposta_cache = 16 * 1024 * 1024
+
+# Parâmetros aceitos na consulta de um conjunto
+parametros_consulta = {"ibge", "uf", "ano_inicio", "ano_fim", "cultura", "formato"}
+
+# Colunas auxiliares de filtro, removidas antes de responder
+colunas_filtro = ["_ibge", "_uf", "_ano", "_cultura"]
+
+# Conjuntos carregados em memória: nome -> {"df", "versao"}
+_dados = {}
+_lock_recarga = threading.Lock()
+
+# Conjuntos cujo arquivo ausente já foi avisado no log
+_ausentes_avisados = set()
+
+# Cache LRU das respostas serializadas: (nome, versao, filtros, formato) -> bytes
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock_cache = threading.Lock()
+
+def caminho_conjunto(config: dict) -> str:
+    """Retorna o caminho do arquivo do conjunto, na pasta das coletas ou no repositório."""
+
+    pasta = pasta_coletas if config.get("coleta") else pasta_raiz
+    return os.path.join(pasta, config["arquivo"])
+
+def carregar_conjunto(nome: str) -> dict:
+    """
+    Lê o arquivo Excel do conjunto e monta o DataFrame indexado pelo código IBGE.
+
+    Parâmetros:
+        nome (str): Nome do conjunto em `conjuntos_dados`.
+
+    Retorna:
+        dict: DataFrame carregado e a versão (mtime) do arquivo.
+    """
+    config = conjuntos_dados[nome]
+    caminho = caminho_conjunto(config)
+    versao = os.stat(caminho).st_mtime_ns
+
+    logger.info(f"Carregando conjunto {nome} de {caminho}")
+    df = pd.read_excel(caminho)
+
+    if config["ibge"]:
+        df["_ibge"] = pd.to_numeric(df[config["ibge"]], errors="coerce").astype("Int64")
+    if config["uf"]:
+        # Na produção agrícola a UF vem no final da localidade ("Cidade - UF")
+        df["_uf"] = df[config["uf"]].astype(str).str.split(" - ").str[-1].str.strip().str.upper()
+    if config.get("ano_data"):
+        df["_ano"] = pd.to_datetime(df[config["ano"]], dayfirst=True, errors="coerce").dt.year.astype("Int64")
+    elif config["ano"]:
+        df["_ano"] = pd.to_numeric(df[config["ano"]], errors="coerce").astype("Int64")
+    if config["cultura"]:
+        df["_cultura"] = df[config["cultura"]].astype(str).str.lower()
+
+    # Ordenar pelo código IBGE permite fatiar o índice sem varrer o frame inteiro
+    if "_ibge" in df.columns:
+        df = df.set_index("_ibge", drop=False).sort_index(kind="stable")
+        df.index.name = None
+
+    logger.info(f"Conjunto {nome} carregado com {len(df)} linhas.")
+    return {"df": df, "versao": versao}
+
+def recarregar_alterados():
+    """Recarrega os conjuntos cujo arquivo foi alterado desde a última leitura."""
+
+    with _lock_recarga:
+        alterou = False
+        for nome, config in conjuntos_dados.items():
+            caminho = caminho_conjunto(config)
+            if not os.path.exists(caminho):
+                if nome not in _dados and nome not in _ausentes_avisados:
+                    logger.warning(f"Arquivo não encontrado para o conjunto {nome}: {caminho}")
+                    _ausentes_avisados.add(nome)
+                continue
+            _ausentes_avisados.discard(nome)
+
+            atual = _dados.get(nome)
+            if atual and atual["versao"] == os.stat(caminho).st_mtime_ns:
+                continue
+
+            try:
+                _dados[nome] = carregar_conjunto(nome)
+                alterou = True
+            except Exception as e:
+                logger.error(f"Erro ao carregar o conjunto {nome}: {e}")
+
+        if alterou:
+            limpar_cache()
+
+def monitorar_arquivos(intervalo: float):
+    """Verifica periodicamente se chegaram novas versões dos arquivos."""
+
+    while True:
+        time.sleep(intervalo)
+        recarregar_alterados()
+
+def filtrar(df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+    """
+    Aplica os filtros de código IBGE, UF, intervalo de anos e cultura.
+
+    Parâmetros:
+        df (pd.DataFrame): Conjunto carregado.
+        filtros (dict): Filtros já validados da consulta.
+
+    Retorna:
+        pd.DataFrame: Linhas que atendem aos filtros.
+    """
+    for chave in filtros:
+        coluna = "_" + chave.replace("_inicio", "").replace("_fim", "")
+        if coluna not in df.columns:
+            raise ValueError(f"Filtro '{chave}' não disponível para este conjunto")
+
+    if "ibge" in filtros:
+        codigos = [c for c in filtros["ibge"] if c in df.index]
+        df = df.loc[codigos]
+    if "uf" in filtros:
+        df = df[df["_uf"].isin(filtros["uf"])]
+    if "ano_inicio" in filtros:
+        df = df[df["_ano"] >= filtros["ano_inicio"]]
+    if "ano_fim" in filtros:
+        df = df[df["_ano"] <= filtros["ano_fim"]]
+    if "cultura" in filtros:
+        df = df[df["_cultura"].str.contains(filtros["cultura"], regex=False, na=False)]
+    return df
+
+def limpar_cache():
+    """Descarta todas as respostas em cache."""
+
+    global _cache_bytes
+    with _lock_cache:
+        _cache.clear()
+        _cache_bytes = 0
+
+def consultar(nome: str, item: dict, filtros: tuple, formato: str) -> bytes:
+    """
+    Executa a consulta sobre o snapshot recebido e serializa o resultado.
+
+    A versão do snapshot faz parte da chave do cache, então uma recarga nunca
+    devolve resultados do arquivo anterior. O cache é limitado pelo total de
+    bytes e respostas maiores que `limite_resposta_cache` não são guardadas.
+
+    Parâmetros:
+        nome (str): Nome do conjunto.
+        item (dict): Snapshot carregado ({"df", "versao"}).
+        filtros (tuple): Filtros gerados por `ler_filtros`.
+        formato (str): "json" ou "arrow".
+
+    Retorna:
+        bytes: Corpo da resposta.
+    """
+    global _cache_bytes
+    chave = (nome, item["versao"], filtros, formato)
+    with _lock_cache:
+        corpo = _cache.get(chave)
+        if corpo is not None:
+            _cache.move_to_end(chave)
+            return corpo
+
+    corpo = serializar(filtrar(item["df"], dict(filtros)), formato)
+
+    if len(corpo) <= limite_resposta_cache:
+        with _lock_cache:
+            if chave not in _cache:
+                _cache[chave] = corpo
+                _cache_bytes += len(corpo)
+            while _cache_bytes > limite_cache_bytes:
+                _, antigo = _cache.popitem(last=False)
+                _cache_bytes -= len(antigo)
+    return corpo
+
+def tabela_arrow(df: pd.DataFrame):
+    """
+    Converte o DataFrame em tabela Arrow mantendo os tipos das colunas.
+
+    Colunas de texto com valores mistos, que o Arrow não consegue converter,
+    são transformadas em texto preservando os valores ausentes.
+    """
+    for coluna in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[coluna], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[coluna] = df[coluna].map(lambda valor: None if pd.isna(valor) else str(valor))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def serializar(df: pd.DataFrame, formato: str) -> bytes:
+    """Remove as colunas auxiliares e serializa o resultado em JSON ou Arrow."""
+
+    df = df.drop(columns=[c for c in colunas_filtro if c in df.columns]).reset_index(drop=True)
+
+    if formato == "arrow":
+        tabela = tabela_arrow(df)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+        return sink.getvalue().to_pybytes()
+
+    return df.to_json(orient="records", force_ascii=False, date_format="iso").encode("utf-8")
+
+def ler_inteiro(nome: str, valor: str) -> int:
+    """Converte um parâmetro da URL em inteiro, com mensagem de erro para o cliente."""
+
+    try:
+        return int(valor.strip())
+    except ValueError:
+        raise ValueError(f"Valor inválido para '{nome}': '{valor}' não é um número inteiro")
+
+def ler_filtros(parametros: dict) -> tuple:
+    """
+    Converte os parâmetros da URL em uma tupla ordenada e hashable de filtros.
+
+    Valores repetidos são descartados, de modo que consultas equivalentes
+    geram a mesma chave de cache.
+    """
+    desconhecidos = sorted(set(parametros) - parametros_consulta)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros desconhecidos: {', '.join(desconhecidos)}")
+
+    filtros = {}
+    if "ibge" in parametros:
+        codigos = ",".join(parametros["ibge"]).split(",")
+        filtros["ibge"] = tuple(sorted({ler_inteiro("ibge", c) for c in codigos if c.strip()}))
+    if "uf" in parametros:
+        ufs = ",".join(parametros["uf"]).split(",")
+        filtros["uf"] = tuple(sorted({u.strip().upper() for u in ufs if u.strip()}))
+    if "ano_inicio" in parametros:
+        filtros["ano_inicio"] = ler_inteiro("ano_inicio", parametros["ano_inicio"][0])
+    if "ano_fim" in parametros:
+        filtros["ano_fim"] = ler_inteiro("ano_fim", parametros["ano_fim"][0])
+    if "cultura" in parametros:
+        filtros["cultura"] = parametros["cultura"][0].strip().lower()
+    return tuple(sorted(filtros.items()))
+
+class ConsultaHandler(BaseHTTPRequestHandler):
+    """Atende GET /conjuntos e GET /conjuntos/<nome>?ibge=&uf=&ano_inicio=&ano_fim=&cultura=&formato="""
+
+    # Mantém a conexão aberta entre consultas do mesmo cliente. Sem o Nagle, o
+    # corpo enviado logo após os cabeçalhos não espera o ACK atrasado (~40 ms).
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def responder(self, status: int, corpo: bytes, tipo: str = "application/json; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def responder_erro(self, status: int, mensagem: str):
+        self.responder(status, json.dumps({"erro": mensagem}, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+
+        if partes == ["conjuntos"]:
+            resumo = {
+                nome: {"linhas": len(item["df"]), "versao": item["versao"],
+                       "colunas": [c for c in item["df"].columns if c not in colunas_filtro]}
+                for nome, item in list(_dados.items())
+            }
+            self.responder(200, json.dumps(resumo, ensure_ascii=False).encode("utf-8"))
+            return
+
+        if len(partes) != 2 or partes[0] != "conjuntos":
+            self.responder_erro(404, "Rota não encontrada")
+            return
+
+        nome = partes[1]
+        item = _dados.get(nome)
+        if item is None:
+            self.responder_erro(404, f"Conjunto '{nome}' não encontrado")
+            return
+
+        parametros = parse_qs(url.query)
+        formato = parametros.pop("formato", ["json"])[0]
+        if formato not in ("json", "arrow"):
+            self.responder_erro(400, f"Formato '{formato}' inválido")
+            return
+        if formato == "arrow" and pa is None:
+            self.responder_erro(406, "pyarrow não está instalado")
+            return
+
+        try:
+            filtros = ler_filtros(parametros)
+            corpo = consultar(nome, item, filtros, formato)
+        except ValueError as e:
+            self.responder_erro(400, str(e))
+            return
+
+        tipo = "application/vnd.apache.arrow.stream" if formato == "arrow" else "application/json; charset=utf-8"
+        self.responder(200, corpo, tipo)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+class ServidorConsulta(ThreadingHTTPServer):
+    """Servidor HTTP com fila de conexões maior que o padrão (5), evitando que o
+    kernel descarte conexões quando muitos clientes chegam ao mesmo tempo."""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+def main(host="127.0.0.1", porta=8000, intervalo=30.0, pasta=None):
+    """Carrega os conjuntos e inicia o serviço de consulta."""
+
+    global pasta_coletas
+    if pasta:
+        pasta_coletas = os.path.abspath(pasta)
+    logger.info(f"Lendo as saídas das coletas em {pasta_coletas}")
+
+    recarregar_alterados()
+    threading.Thread(target=monitorar_arquivos, args=(intervalo,), daemon=True).start()
+
+    servidor = ServidorConsulta((host, porta), ConsultaHandler)
+    logger.info(f"Serviço de consulta disponível em http://{host}:{porta}/conjuntos")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Encerrando o serviço de consulta.")
+    finally:
+        servidor.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de consulta aos dados agrícolas.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--intervalo", type=float, default=30.0,
+                        help="Segundos entre as verificações de novos arquivos.")
+    parser.add_argument("--pasta-coletas", default=None,
+                        help="Pasta onde as coletas salvam dias_aptos_manejo_solo.xlsx e dias_aptos_cenarios.xlsx "
+                             "(padrão: pasta atual).")
+    args = parser.parse_args()
+    main(args.host, args.porta, args.intervalo, args.pasta_coletas)